@@ -53,6 +53,7 @@ about = get_about()
 
 BUNDLES = (
     "aws_batch",
+    "columnar",
     "docker",
     "redis",
 )
@@ -1,5 +1,6 @@
 from os import path
 
+from .context import current_job  # pylint: disable=unused-import
 from .decorators import job  # pylint: disable=unused-import
 from .job import Job  # pylint: disable=unused-import
 
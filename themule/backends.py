@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+import math
 import os
+import threading
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Generator
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Generator, Hashable, List, Optional
 from uuid import uuid4
 
 from .conf import NOTSET, settings
 from .exceptions import ConfigurationError
 from .import_helpers import import_by_path
-from .job import StartedJob
+from .job import JobFunction, StartedJob
+from .rate_limiting import call_with_retries, get_rate_limiter
+from .transports import ARGV, AUTO, ENV, FILE, STDIN, Delivery, deliver
 
 if TYPE_CHECKING:
     from .job import Job
@@ -21,8 +26,18 @@ DEFAULT_BACKEND = "themule.backends.AwsBatchBackend"
 class BaseBackend:
     OPTION_PREFIX = "base"
 
+    # transports of job specs the backend can use, the cheapest first
+    TRANSPORTS = (ARGV,)
+    # the biggest job spec (in bytes) `auto` transport passes as an argument
+    ARGV_LIMIT = 64 * 1024
+    # the biggest compressed spec `auto` transport passes in environment variables;
+    # exec fails once arguments and environment together exceed ARG_MAX (2 MiB)
+    ENV_LIMIT = 1024 * 1024
+    # seconds the worker gets to enforce the job timeout itself before it's killed
+    TIMEOUT_GRACE = 30
+
     def __init__(self, **options) -> None:
-        pass
+        self.transport = AUTO
 
     def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
         raise NotImplementedError()
@@ -30,9 +45,50 @@ class BaseBackend:
     def purge(self):
         raise NotImplementedError()
 
+    def terminate_job(self, started_job: StartedJob, reason: str):
+        raise NotImplementedError()
+
     def get_path(self):
         return f"{self.__module__}.{self.__class__.__name__}"
 
+    def get_delivery(
+        self, serialized_job: str, file_path: Optional[str] = None
+    ) -> Delivery:
+        transport = self.transport
+        if transport == AUTO:
+            return self._get_auto_delivery(serialized_job, file_path)
+
+        if transport not in self.TRANSPORTS:
+            raise ConfigurationError(
+                f"{self.__class__.__name__} does not support `{transport}` job spec transport"
+            )
+
+        return deliver(serialized_job, transport, file_path)
+
+    def _get_auto_delivery(
+        self, serialized_job: str, file_path: Optional[str] = None
+    ) -> Delivery:
+        # escalates to the next transport while the spec doesn't fit the limit
+        limits = {ARGV: self.ARGV_LIMIT, ENV: self.ENV_LIMIT}
+        for transport in self.TRANSPORTS[:-1]:
+            if transport not in limits:
+                return deliver(serialized_job, transport, file_path)
+
+            delivery = deliver(serialized_job, transport)
+            if delivery.get_size() <= limits[transport]:
+                return delivery
+
+        return deliver(serialized_job, self.TRANSPORTS[-1], file_path)
+
+    def get_command(self, serializer: BaseSerializer, delivery: Delivery) -> List[str]:
+        return [
+            "themule",
+            "execute-job",
+            "--serializer",
+            serializer.get_path(),
+            *delivery.arguments,
+        ]
+
     def get_option_value(self, options, option, default=NOTSET, cast=None):
         return settings.get_value_for_job(
             options,
@@ -50,9 +106,38 @@ class AwsBatchBackend(BaseBackend):
     class _QueuedJob:
         job_id: str
 
+    # AWS Batch doesn't accept attempt timeouts shorter than this
+    MIN_TIMEOUT = 60
+    # AWS Batch limits the size of container overrides to 30 KiB
+    CONTAINER_OVERRIDES_LIMIT = 30 * 1024 - 1024
+
+    TRANSPORTS = (ARGV, ENV)
+    ARGV_LIMIT = CONTAINER_OVERRIDES_LIMIT
+
+    DEFAULT_API_RATE = 10  # calls per second
+    DEFAULT_API_MAX_RATE = 50  # calls per second
+    DEFAULT_API_TIMEOUT = 60  # seconds
+
+    # shared by all backend instances in the process, like the rate limiters
+    _clients: Dict[Hashable, Any] = {}
+    _clients_lock = threading.Lock()
+
     def __init__(self, **options) -> None:
         self.queue_name = self.get_option_value(options, "queue_name")
         self.job_definition = self.get_option_value(options, "job_definition")
+        self.transport = self.get_option_value(
+            options, "transport", default=AUTO, cast=str
+        )
+        self.api_rate = self.get_option_value(
+            options, "api_rate", default=self.DEFAULT_API_RATE, cast=float
+        )
+        self.api_max_rate = self.get_option_value(
+            options, "api_max_rate", default=self.DEFAULT_API_MAX_RATE, cast=float
+        )
+        self.api_timeout = self.get_option_value(
+            options, "api_timeout", default=self.DEFAULT_API_TIMEOUT, cast=float
+        )
+        self._rate_limiter = None
 
     def purge(self):
         statuses = ("SUBMITTED", "PENDING", "RUNNABLE", "STARTING", "RUNNING")
@@ -60,28 +145,36 @@ class AwsBatchBackend(BaseBackend):
             for job in self._list_jobs(status):
                 self._terminate_job(job, "Queue purged")
 
-    def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
-        try:
-            import boto3
-        except ImportError:
-            raise ConfigurationError("AWS support not installed")
+    def terminate_job(self, started_job: StartedJob, reason: str):
+        self._terminate_job(self._QueuedJob(job_id=started_job.job_id), reason)
 
+    def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
         serialized_job = serializer.serialize(job)
+        delivery = self.get_delivery(serialized_job)
+        if delivery.get_size() > self.CONTAINER_OVERRIDES_LIMIT:
+            raise ConfigurationError(
+                f"Job spec is too big for AWS Batch container overrides ({delivery.get_size()} bytes), use a store-based serializer like RedisStoreSerializer"
+            )
 
-        client = boto3.client("batch")
-        response = client.submit_job(
+        submit_kwargs = {}
+        if job.timeout:
+            submit_kwargs["timeout"] = {
+                "attemptDurationSeconds": max(math.ceil(job.timeout), self.MIN_TIMEOUT),
+            }
+
+        response = self._call(
+            "submit_job",
             jobName=str(job.id),
             jobQueue=self.queue_name,
             jobDefinition=self.job_definition,
             containerOverrides={
-                "command": [
-                    "themule",
-                    "execute-job",
-                    "--serializer",
-                    serializer.get_path(),
-                    serialized_job,
+                "command": self.get_command(serializer, delivery),
+                "environment": [
+                    {"name": name, "value": value}
+                    for name, value in delivery.environment.items()
                 ],
             },
+            **submit_kwargs,
         )
 
         job_id = str(response.get("jobId"))
@@ -95,13 +188,8 @@ class AwsBatchBackend(BaseBackend):
     def _list_jobs(
         self, status: str | None = None
     ) -> Generator[_QueuedJob, None, None]:
-        try:
-            import boto3
-        except ImportError:
-            raise ConfigurationError("AWS support not installed")
-
         is_first = True
-        client = boto3.client("batch")
+        next_token = None
 
         while is_first or next_token:
             is_first = False
@@ -113,7 +201,8 @@ class AwsBatchBackend(BaseBackend):
             if status:
                 kwargs["jobStatus"] = status
 
-            result = client.list_jobs(
+            result = self._call(
+                "list_jobs",
                 jobQueue=self.queue_name,
                 **kwargs,
             )
@@ -124,21 +213,71 @@ class AwsBatchBackend(BaseBackend):
                 )
 
     def _terminate_job(self, job: _QueuedJob, reason: str):
+        self._call(
+            "terminate_job",
+            jobId=job.job_id,
+            reason=reason,
+        )
+
+    def _get_client(self):
         try:
             import boto3
+            from botocore.config import Config
         except ImportError:
             raise ConfigurationError("AWS support not installed")
 
-        client = boto3.client("batch")
-        client.terminate_job(
-            jobId=job.job_id,
-            reason=reason,
+        with self._clients_lock:
+            if boto3.DEFAULT_SESSION is None:
+                boto3.setup_default_session()
+            session = boto3.DEFAULT_SESSION
+
+            # limits of AWS API are per account and region; the profile stands in
+            # for the account, access keys of temporary credentials change on refresh
+            key = ("batch", session.region_name, session.profile_name)
+            if key not in self._clients:
+                # retries are made by call_with_retries within the rate limit
+                self._clients[key] = session.client(
+                    "batch",
+                    config=Config(
+                        retries={"mode": "standard", "total_max_attempts": 1}
+                    ),
+                )
+            client = self._clients[key]
+
+        self._rate_limiter = get_rate_limiter(
+            key,
+            rate=self.api_rate,
+            max_rate=self.api_max_rate,
+        )
+        return client
+
+    def _call(self, method: str, **kwargs):
+        client = self._get_client()
+        # imported after _get_client has reported a missing AWS support
+        from botocore import exceptions as botocore_exceptions
+
+        return call_with_retries(
+            self._rate_limiter,
+            partial(getattr(client, method), **kwargs),
+            timeout=self.api_timeout,
+            transient_errors=(
+                botocore_exceptions.ConnectionError,
+                botocore_exceptions.HTTPClientError,
+            ),
         )
 
+    def get_api_metrics(self):
+        self._get_client()
+        return self._rate_limiter.get_metrics()
+
 
 class LocalDockerBackend(BaseBackend):
     OPTION_PREFIX = "docker"
 
+    TRANSPORTS = (ARGV, ENV, FILE)
+
+    DEFAULT_SPEC_PATH = "/tmp/themule/specs"
+
     def __init__(self, **options) -> None:
         self.docker_image = self.get_option_value(options, "image")
         self.entrypoint = self.get_option_value(
@@ -156,6 +295,12 @@ class LocalDockerBackend(BaseBackend):
         self.run_options = self.get_option_value(
             options, "run_options", default={}, cast=dict
         )
+        self.transport = self.get_option_value(
+            options, "transport", default=AUTO, cast=str
+        )
+        self.spec_path = self.get_option_value(
+            options, "spec_path", default=self.DEFAULT_SPEC_PATH, cast=str
+        )
 
     def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
         try:
@@ -165,22 +310,25 @@ class LocalDockerBackend(BaseBackend):
 
         serialized_job = serializer.serialize(job)
 
+        spec_file_path = os.path.join(self.spec_path, f"{job.id}.spec")
+        delivery = self.get_delivery(serialized_job, spec_file_path)
+
+        mounts = serializer.get_mounts()
+        if delivery.transport == FILE:
+            mounts = [*mounts, self.spec_path]
+
         environment = self.environment
         if self.pass_environment:
             environment = {
                 **os.environ,
                 **environment,
             }
+        environment = {
+            **environment,
+            **delivery.environment,
+        }
 
-        docker_command = [
-            "themule",
-            "execute-job",
-            "--serializer",
-            serializer.get_path(),
-            serialized_job,
-        ]
-
-        client = docker.from_env()
+        docker_command = self.get_command(serializer, delivery)
 
         run_kwargs = {
             "entrypoint": self.entrypoint,
@@ -189,37 +337,105 @@ class LocalDockerBackend(BaseBackend):
             **self.run_options,
         }
 
-        container = client.containers.run(
-            self.docker_image,
-            docker_command,
-            detach=True,
-            **run_kwargs,
-        )
+        if mounts:
+            volumes = run_kwargs.get("volumes") or {}
+            if isinstance(volumes, dict):
+                volumes = {
+                    **{path: {"bind": path, "mode": "rw"} for path in mounts},
+                    **volumes,
+                }
+            else:
+                volumes = [*(f"{path}:{path}:rw" for path in mounts), *volumes]
+            run_kwargs["volumes"] = volumes
+
+        try:
+            client = docker.from_env()
+            container = client.containers.run(
+                self.docker_image,
+                docker_command,
+                detach=True,
+                **run_kwargs,
+            )
+        except BaseException:
+            # otherwise the spec file is removed by the worker once it's read
+            if delivery.transport == FILE:
+                os.remove(spec_file_path)
+            raise
 
         job_id = container.id
 
-        return StartedJob(
+        started_job = StartedJob(
             self.get_path(),
             job,
             job_id,
         )
+        if job.timeout:
+            # SIGALRM in the worker can't interrupt a job stuck outside of Python code
+            timer = threading.Timer(
+                job.timeout + self.TIMEOUT_GRACE,
+                self.terminate_job,
+                args=(started_job, "Timeout exceeded"),
+            )
+            timer.daemon = True
+            timer.start()
+        return started_job
+
+    def terminate_job(self, started_job: StartedJob, reason: str):
+        try:
+            import docker
+            from docker.errors import APIError
+        except ImportError:
+            raise ConfigurationError("Docker support not installed")
+
+        client = docker.from_env()
+        try:
+            client.containers.get(started_job.job_id).kill()
+        except APIError:
+            # the container is gone (404) or has already exited (409)
+            pass
 
 
 class LocalProcess(BaseBackend):
+    OPTION_PREFIX = "local_process"
+
+    TRANSPORTS = (ARGV, STDIN, ENV)
+
+    def __init__(self, **options) -> None:
+        self.transport = self.get_option_value(
+            options, "transport", default=AUTO, cast=str
+        )
+
     def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
         import subprocess
 
         serialized_job = serializer.serialize(job)
+        delivery = self.get_delivery(serialized_job)
 
-        command = [
-            "themule",
-            "execute-job",
-            "--serializer",
-            serializer.get_path(),
-            serialized_job,
-        ]
+        command = self.get_command(serializer, delivery)
+
+        env = None
+        if delivery.environment:
+            env = {
+                **os.environ,
+                **delivery.environment,
+            }
 
-        process = subprocess.Popen(command)
+        stdin = subprocess.PIPE if delivery.stdin is not None else None
+        process = subprocess.Popen(command, stdin=stdin, env=env)
+        if delivery.stdin is not None:
+            # specs bigger than the pipe buffer would block until the worker reads them
+            threading.Thread(
+                target=self._write_stdin,
+                args=(process, delivery.stdin),
+            ).start()
+
+        if job.timeout:
+            # SIGALRM in the worker can't interrupt a job stuck outside of Python code
+            threading.Thread(
+                target=self._enforce_timeout,
+                args=(process, job.timeout + self.TIMEOUT_GRACE),
+                daemon=True,
+            ).start()
 
         job_id = process.pid
 
@@ -229,12 +445,43 @@ class LocalProcess(BaseBackend):
             job_id,
         )
 
+    @staticmethod
+    def _write_stdin(process, data: bytes):
+        try:
+            process.stdin.write(data)
+            process.stdin.close()
+        except BrokenPipeError:
+            # the worker exited before reading the spec, it reports the failure itself
+            pass
+
+    @staticmethod
+    def _enforce_timeout(process, timeout: float):
+        import subprocess
+
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def terminate_job(self, started_job: StartedJob, reason: str):
+        import signal
+
+        try:
+            os.kill(started_job.job_id, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
 
 class Immediate(BaseBackend):
     def submit_job(self, job: Job, serializer: BaseSerializer) -> StartedJob:
-        func = import_by_path(job.func)
+        from .executor import execute_job
 
-        func(*job.args, **job.kwargs)
+        func = import_by_path(job.func)
+        if isinstance(func, JobFunction):
+            execute_job(job)
+        else:
+            func(*job.args, **job.kwargs)
         job_id = str(uuid4())
 
         return StartedJob(
@@ -242,3 +489,7 @@ class Immediate(BaseBackend):
             job,
             job_id,
         )
+
+    def terminate_job(self, started_job: StartedJob, reason: str):
+        # the job has already finished when submit_job returned
+        pass
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import pickle
+from typing import TYPE_CHECKING, Any, List
+
+from .conf import NOTSET, settings
+from .exceptions import CheckpointError
+
+if TYPE_CHECKING:
+    from .stores import BaseStore
+
+
+class Checkpointer:
+    """
+    Saves and restores the state of a single job.
+
+    The pickled state is split into chunks addressed by their hash, so saving
+    a state that differs only partially from the previous one writes just the
+    changed chunks. A manifest listing the chunks is written last, so a
+    checkpoint interrupted half way leaves the previous one intact.
+    """
+
+    OPTION_PREFIX = "checkpoint"
+
+    DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024  # 64 MiB
+
+    def __init__(self, store: BaseStore, job_id: str, **options) -> None:
+        self.store = store
+        self.job_id = job_id
+        self.chunk_size = self.get_option_value(
+            options, "chunk_size", default=self.DEFAULT_CHUNK_SIZE, cast=int
+        )
+        self.max_size = self.get_option_value(
+            options, "max_size", default=self.DEFAULT_MAX_SIZE, cast=int
+        )
+        self._chunks: List[str] = None
+
+    def _make_key(self, name: str) -> str:
+        return f"checkpoints/{self.job_id}/{name}"
+
+    def _get_chunks(self) -> List[str]:
+        if self._chunks is None:
+            manifest = self.store.get(self._make_key("manifest"))
+            self._chunks = json.loads(manifest)["chunks"] if manifest else []
+        return self._chunks
+
+    def save(self, state: Any):
+        data = pickle.dumps(state)
+        if len(data) > self.max_size:
+            raise CheckpointError(
+                f"Checkpoint of job {self.job_id} has {len(data)} bytes, the limit is {self.max_size}"
+            )
+
+        previous_chunks = self._get_chunks()
+        chunks = []
+        for offset in range(0, len(data), self.chunk_size):
+            chunk = data[offset : offset + self.chunk_size]
+            digest = hashlib.sha256(chunk).hexdigest()
+            if digest not in previous_chunks and digest not in chunks:
+                self.store.set(self._make_key(f"chunks/{digest}"), chunk)
+            chunks.append(digest)
+
+        manifest = {"chunks": chunks, "size": len(data)}
+        self.store.set(self._make_key("manifest"), json.dumps(manifest).encode())
+        self._chunks = chunks
+
+        for digest in set(previous_chunks) - set(chunks):
+            self.store.delete(self._make_key(f"chunks/{digest}"))
+
+    def load(self, default: Any = None) -> Any:
+        chunks = self._get_chunks()
+        if not chunks:
+            return default
+
+        data = b"".join(
+            self.store.get(self._make_key(f"chunks/{digest}")) for digest in chunks
+        )
+        return pickle.loads(data)
+
+    def clear(self):
+        chunks = self._get_chunks()
+        self.store.delete(self._make_key("manifest"))
+        for digest in set(chunks):
+            self.store.delete(self._make_key(f"chunks/{digest}"))
+        self._chunks = []
+
+    def get_option_value(self, options, option, default=NOTSET, cast=None):
+        return settings.get_value_for_job(
+            options,
+            self.OPTION_PREFIX,
+            option,
+            default=default,
+            cast=cast,
+        )
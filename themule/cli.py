@@ -1,8 +1,10 @@
-import os
+import signal
+import sys
 from typing import Type
 
 import click
 
+from . import transports
 from .conf import settings
 from .executor import execute_job
 from .import_helpers import import_by_path
@@ -22,8 +24,28 @@ def cli():
     type=str,
     help="Path to serializer's class",
 )
-@click.argument("job-spec", type=str)
-def execute_job_cli(serializer_path, job_spec):
+@click.option(
+    "-t",
+    "--transport",
+    type=click.Choice(transports.TRANSPORTS),
+    default=transports.ARGV,
+    help="How the job spec is passed to the command",
+)
+@click.option(
+    "--spec-file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Path to the job spec file for `file` transport",
+)
+@click.argument("job-spec", type=str, required=False)
+def execute_job_cli(serializer_path, transport, spec_file, job_spec):
+    # read the spec first, so the backend feeding stdin isn't kept waiting
+    job_spec = transports.receive(
+        transport,
+        job_spec,
+        stdin=sys.stdin.buffer,
+        file_path=spec_file,
+    )
+
     bootstrap = settings.BOOTSTRAP_CALLBACK
     if bootstrap:
         bootstrap_func = import_by_path(bootstrap)
@@ -36,6 +58,13 @@ def execute_job_cli(serializer_path, job_spec):
     serializer = serializer_class()
     job = serializer.unserialize(job_spec)
 
-    execute_job(job)
+    # a terminated job unwinds like a failed one, so it gets cleaned up too
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        execute_job(job)
+    finally:
+        serializer.cleanup(job)
+
 
-    serializer.cleanup(job)
+def _exit_on_signal(signum, frame):
+    sys.exit(128 + signum)
@@ -47,6 +47,22 @@ class Settings:
 
         return self._get_from_env("JOB_SERIALIZER", default=DEFAULT_SERIALIZER)
 
+    @property
+    def CHECKPOINT_STORE(self):
+        return self._get_from_env("CHECKPOINT_STORE", default=None)
+
+    @property
+    def HEARTBEAT_STORE(self):
+        return self._get_from_env("HEARTBEAT_STORE", default=None)
+
+    @property
+    def COLUMNAR_FORMAT(self):
+        return self._get_from_env("COLUMNAR_FORMAT", default="ipc")
+
+    @property
+    def COLUMNAR_COMPRESSION(self):
+        return self._get_from_env("COLUMNAR_COMPRESSION", default=None)
+
     @property
     def STRICT_MODE(self):
         return self._get_from_env("STRICT_MODE", default=True)
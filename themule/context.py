@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Optional
+
+from .checkpoints import Checkpointer
+
+if TYPE_CHECKING:
+    from .heartbeats import Heartbeater
+    from .job import Job, JobFunction
+
+
+class JobContext:
+    """Gives the job function access to its job while it's being executed"""
+
+    def __init__(
+        self,
+        job: Job,
+        job_function: JobFunction,
+        heartbeater: Optional[Heartbeater] = None,
+    ) -> None:
+        self.job = job
+        self.job_function = job_function
+        self.heartbeater = heartbeater
+        self._checkpointer = None
+
+    @property
+    def id(self):
+        return self.job.id
+
+    @property
+    def checkpointer(self) -> Checkpointer:
+        if self._checkpointer is None:
+            options = self.job_function.additional_kwargs
+            self._checkpointer = Checkpointer(
+                self.job_function.get_checkpoint_store(options),
+                str(self.job.id),
+                **options,
+            )
+        return self._checkpointer
+
+    def checkpoint(self, state: Any):
+        """Saves the state, so a retried attempt of the job can resume from it"""
+        self.checkpointer.save(state)
+
+    def restore(self, default: Any = None) -> Any:
+        """Returns the last checkpointed state or `default` if there's none"""
+        return self.checkpointer.load(default)
+
+    def progress(self, progress: Any):
+        """Reports the progress (any JSON-serializable value) with the next heartbeat"""
+        if self.heartbeater is not None:
+            self.heartbeater.set_progress(progress)
+
+    def clear_checkpoint(self):
+        if self._checkpointer is not None:
+            self._checkpointer.clear()
+
+
+_current_job: ContextVar[Optional[JobContext]] = ContextVar(
+    "themule_current_job", default=None
+)
+
+
+def current_job() -> JobContext:
+    context = _current_job.get()
+    if context is None:
+        raise RuntimeError("current_job() can only be used inside of a running job")
+    return context
+
+
+@contextmanager
+def activate(context: JobContext):
+    token = _current_job.set(context)
+    try:
+        yield context
+    finally:
+        _current_job.reset(token)
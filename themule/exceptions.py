@@ -1,2 +1,14 @@
 class ConfigurationError(Exception):
     pass
+
+
+class CheckpointError(Exception):
+    pass
+
+
+class JobTimeoutError(Exception):
+    pass
+
+
+class RateLimitError(Exception):
+    pass
@@ -1,8 +1,38 @@
+import signal
+import threading
+from contextlib import contextmanager
+
 from .conf import settings
+from .context import JobContext, activate
+from .exceptions import JobTimeoutError
+from .heartbeats import FAILED, SUCCEEDED, Heartbeater
 from .import_helpers import import_by_path
 from .job import Job, JobFunction
 
 
+@contextmanager
+def time_limit(seconds):
+    # alarms can only be handled in the main thread
+    if (
+        not seconds
+        or not hasattr(signal, "SIGALRM")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def handler(signum, frame):
+        raise JobTimeoutError(f"Job has exceeded its timeout of {seconds}s")
+
+    previous_handler = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
 def execute_job(job: Job):
     func = import_by_path(job.func)
 
@@ -10,4 +40,33 @@ def execute_job(job: Job):
         if not isinstance(func, JobFunction):
             raise ValueError(f"{job.func} is not marked as TheMule job.")
 
-    func(*job.args, **job.kwargs)
+    job_function = func
+    if not isinstance(job_function, JobFunction):
+        job_function = JobFunction(job.func, function=func)
+
+    options = job_function.additional_kwargs
+    heartbeater = None
+    heartbeat_store = job_function.get_heartbeat_store(options)
+    if heartbeat_store:
+        heartbeater = Heartbeater(heartbeat_store, str(job.id), **options)
+        heartbeater.start()
+
+    context = JobContext(job, job_function, heartbeater=heartbeater)
+    status = FAILED
+    try:
+        kwargs = job.kwargs
+        if (
+            job_function.restore_argument
+            and job_function.restore_argument not in kwargs
+        ):
+            kwargs = {**kwargs, job_function.restore_argument: context.restore()}
+
+        with activate(context), time_limit(job.timeout):
+            func(*job.args, **kwargs)
+        status = SUCCEEDED
+    finally:
+        if heartbeater:
+            heartbeater.stop(status)
+
+    # the job has succeeded, there's nothing to resume from anymore
+    context.clear_checkpoint()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Optional
+
+from .conf import NOTSET, settings
+
+if TYPE_CHECKING:
+    from .stores import BaseStore
+
+
+RUNNING = "RUNNING"
+SUCCEEDED = "SUCCEEDED"
+FAILED = "FAILED"
+
+
+@dataclass
+class Heartbeat:
+    job_id: str
+    status: str
+    started_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
+    progress: Any = None
+
+    def is_finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def get_runtime(self, now: Optional[float] = None) -> float:
+        end = self.finished_at or now or time.time()
+        return end - self.started_at
+
+
+def get_heartbeat(store: BaseStore, job_id: str) -> Optional[Heartbeat]:
+    data = store.get(f"heartbeats/{job_id}")
+    if data is None:
+        return None
+    return Heartbeat(**json.loads(data))
+
+
+class Heartbeater:
+    """Periodically reports that the job is alive (and its progress) from a background thread"""
+
+    OPTION_PREFIX = "heartbeat"
+
+    DEFAULT_INTERVAL = 30  # seconds
+
+    def __init__(self, store: BaseStore, job_id: str, **options) -> None:
+        self.store = store
+        self.interval = self.get_option_value(
+            options, "interval", default=self.DEFAULT_INTERVAL, cast=float
+        )
+        now = time.time()
+        self.heartbeat = Heartbeat(
+            job_id=job_id,
+            status=RUNNING,
+            started_at=now,
+            updated_at=now,
+        )
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._beat()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self, status: str):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+        with self._lock:
+            self.heartbeat.status = status
+            self.heartbeat.finished_at = time.time()
+        try:
+            self._beat()
+        except Exception:  # pylint: disable=broad-except
+            # reporting the outcome must not change the outcome
+            pass
+
+    def set_progress(self, progress: Any):
+        with self._lock:
+            self.heartbeat.progress = progress
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self._beat()
+            except Exception:  # pylint: disable=broad-except
+                # a missed beat must not kill the job
+                pass
+
+    def _beat(self):
+        with self._lock:
+            self.heartbeat.updated_at = time.time()
+            data = json.dumps(asdict(self.heartbeat)).encode()
+        self.store.set(f"heartbeats/{self.heartbeat.job_id}", data)
+
+    def get_option_value(self, options, option, default=NOTSET, cast=None):
+        return settings.get_value_for_job(
+            options,
+            self.OPTION_PREFIX,
+            option,
+            default=default,
+            cast=cast,
+        )
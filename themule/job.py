@@ -5,11 +5,13 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
 from uuid import UUID, uuid4
 
 from .conf import settings
+from .exceptions import ConfigurationError
 from .import_helpers import import_by_path
 
 if TYPE_CHECKING:
     from .backends import BaseBackend
     from .serializers import BaseSerializer
+    from .stores import BaseStore
 
 
 @dataclass
@@ -18,6 +20,7 @@ class Job:
     func: str
     args: List[Any]
     kwargs: Dict[str, Any]
+    timeout: Optional[int] = None
 
 
 @dataclass
@@ -35,12 +38,20 @@ class JobFunction:
         function: Optional[Callable] = None,
         serializer: Optional[Union[BaseSerializer, str]] = None,
         backend: Optional[Union[BaseBackend, str]] = None,
+        checkpoint_store: Optional[Union[BaseStore, str]] = None,
+        restore_argument: Optional[str] = None,
+        heartbeat_store: Optional[Union[BaseStore, str]] = None,
+        timeout: Optional[int] = None,
         **kwargs,
     ) -> None:
         self.function_path = function_path
         self.function = function
         self.serializer = serializer
         self.backend = backend
+        self.checkpoint_store = checkpoint_store
+        self.restore_argument = restore_argument
+        self.heartbeat_store = heartbeat_store
+        self.timeout = timeout
         self.additional_kwargs = kwargs
 
     @classmethod
@@ -71,17 +82,35 @@ class JobFunction:
         function_name = function.__name__
         return f"{module_path}.{function_name}"
 
+    def make_job(self, args, kwargs) -> Job:
+        return Job(
+            id=uuid4(),
+            func=self.function_path,
+            args=args,
+            kwargs=kwargs,
+            timeout=self.timeout,
+        )
+
     def submit(self, *args, **kwargs) -> StartedJob:
-        job = Job(id=uuid4(), func=self.function_path, args=args, kwargs=kwargs)
+        job = self.make_job(args, kwargs)
 
         serializer = self.get_serializer(self.additional_kwargs)
         backend = self.get_backend(self.additional_kwargs)
 
-        started_job = backend.submit_job(
-            job,
-            serializer,
-        )
-        return started_job
+        return self.start_job(job, serializer, backend)
+
+    def start_job(
+        self, job: Job, serializer: BaseSerializer, backend: BaseBackend
+    ) -> StartedJob:
+        try:
+            return backend.submit_job(
+                job,
+                serializer,
+            )
+        except Exception:
+            # the worker won't run, so it won't clean up after the job either
+            serializer.cleanup(job)
+            raise
 
     def get_serializer(self, options) -> BaseSerializer:
         from .serializers import BaseSerializer
@@ -112,3 +141,32 @@ class JobFunction:
         backend_class = import_by_path(backend_class_path)
         assert issubclass(backend_class, BaseBackend)
         return backend_class(**options)
+
+    def get_checkpoint_store(self, options) -> BaseStore:
+        # there's no safe default: a store local to the worker doesn't survive
+        # the retried attempt being scheduled in another container
+        store = self.checkpoint_store or settings.CHECKPOINT_STORE
+        if not store:
+            raise ConfigurationError(
+                "You have to set `checkpoint_store` in the job decorator or set the system-wide default with `THEMULE_CHECKPOINT_STORE` environmental variable"
+            )
+        return self._get_store(store, options)
+
+    def get_heartbeat_store(self, options) -> Optional[BaseStore]:
+        store = self.heartbeat_store or settings.HEARTBEAT_STORE
+        if not store:
+            return None
+        return self._get_store(store, options)
+
+    def _get_store(self, store, options) -> BaseStore:
+        from .stores import BaseStore
+
+        if isinstance(store, BaseStore):
+            return store
+
+        if isinstance(store, type) and issubclass(store, BaseStore):
+            return store(**options)
+
+        store_class = import_by_path(store)
+        assert issubclass(store_class, BaseStore)
+        return store_class(**options)
@@ -0,0 +1,221 @@
+"""
+Client-side rate limiting of cloud API calls.
+
+Calls to an API share a token bucket per account and region. The rate of the
+bucket is adjusted with AIMD: it grows additively while calls succeed and is
+cut multiplicatively when the API throttles, so the client settles close to
+the highest throughput the API allows. Throttled calls, server errors and
+connection errors are retried with jittered exponential backoff until
+their deadline.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Type
+
+from .exceptions import RateLimitError
+
+THROTTLING_ERROR_CODES = (
+    "TooManyRequestsException",
+    "ThrottlingException",
+    "Throttling",
+    "ThrottledException",
+    "RequestLimitExceeded",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "SlowDown",
+)
+
+
+TRANSIENT_ERROR_CODES = (
+    "InternalError",
+    "InternalFailure",
+    "InternalServerError",
+    "ServerException",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return False
+
+    code = response.get("Error", {}).get("Code")
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    return code in THROTTLING_ERROR_CODES or status == 429
+
+
+def is_transient_error(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return False
+
+    code = response.get("Error", {}).get("Code")
+    status = response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+    return code in TRANSIENT_ERROR_CODES or status >= 500
+
+
+class AdaptiveRateLimiter:
+    """Token bucket with AIMD rate adjustment; safe to share between threads"""
+
+    def __init__(
+        self,
+        rate: float = 10.0,
+        *,
+        min_rate: float = 0.5,
+        max_rate: float = 50.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        # requests per second the rate grows by over a second of successful calls
+        self.increase = increase
+        self.decrease = decrease
+
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._updated_at = time.monotonic()
+        self._decreased_at = 0.0
+        self._metrics = {
+            "calls": 0,
+            "throttled": 0,
+            "retries": 0,
+            "failures": 0,
+            "wait_time": 0.0,
+        }
+
+    def _refill(self, now: float):
+        # the bucket holds at most a second worth of tokens
+        capacity = max(self.rate, 1.0)
+        self._tokens = min(
+            capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Waits for a token; returns False if it's not available before the deadline"""
+        started_at = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._metrics["wait_time"] += now - started_at
+                    return True
+                delay = (1 - self._tokens) / self.rate
+
+            if deadline is not None and time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+    def on_success(self):
+        with self._lock:
+            self._metrics["calls"] += 1
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self):
+        with self._lock:
+            self._metrics["calls"] += 1
+            self._metrics["throttled"] += 1
+
+            # calls in flight when the limit was hit are throttled together,
+            # react to them as to a single congestion signal
+            now = time.monotonic()
+            if now - self._decreased_at < 1 / self.rate:
+                return
+            self._decreased_at = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, 0.0)
+
+    def on_error(self):
+        with self._lock:
+            self._metrics["calls"] += 1
+
+    def record(self, metric: str, value=1):
+        with self._lock:
+            self._metrics[metric] += value
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._metrics, "rate": self.rate}
+
+
+_rate_limiters: Dict[Hashable, AdaptiveRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: Hashable, **options) -> AdaptiveRateLimiter:
+    """
+    Returns the limiter shared by all calls with the same key (e.g. account and region).
+
+    Options are used only when the limiter is created by the first call.
+    """
+    with _rate_limiters_lock:
+        if key not in _rate_limiters:
+            _rate_limiters[key] = AdaptiveRateLimiter(**options)
+        return _rate_limiters[key]
+
+
+def get_rate_limiter_metrics() -> Dict[Hashable, Dict[str, Any]]:
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {key: limiter.get_metrics() for key, limiter in limiters.items()}
+
+
+def call_with_retries(
+    limiter: AdaptiveRateLimiter,
+    func: Callable[[], Any],
+    *,
+    timeout: float = 60,
+    base_delay: float = 0.1,
+    max_delay: float = 10,
+    transient_errors: Tuple[Type[Exception], ...] = (),
+):
+    """
+    Calls `func` within the rate limit, retrying failed calls until `timeout` passes.
+
+    Throttled calls slow the limiter down; server errors and `transient_errors`
+    (e.g. connection errors of the client library) are retried without that.
+    """
+    deadline = time.monotonic() + timeout
+    attempt = 0
+    error = None
+    while True:
+        if not limiter.acquire(deadline):
+            limiter.record("failures")
+            if error:
+                raise error
+            raise RateLimitError(f"No API call allowed within {timeout}s")
+
+        try:
+            result = func()
+        except Exception as e:  # pylint: disable=broad-except
+            if is_throttling_error(e):
+                limiter.on_throttle()
+            else:
+                limiter.on_error()
+                if not (isinstance(e, transient_errors) or is_transient_error(e)):
+                    raise
+            error = e
+        else:
+            limiter.on_success()
+            return result
+
+        # full jitter spreads retries of calls failed at the same time
+        delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+        if time.monotonic() + delay > deadline:
+            limiter.record("failures")
+            raise error
+
+        attempt += 1
+        limiter.record("retries")
+        time.sleep(delay)
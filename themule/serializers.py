@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import base64
 import json
+import mmap
+import os
+import shutil
+import sys
 from datetime import date, datetime
-from typing import TYPE_CHECKING
-from uuid import UUID
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+from uuid import UUID, uuid4
 
 from .conf import NOTSET, settings
 from .exceptions import ConfigurationError
@@ -30,6 +36,10 @@ class BaseSerializer:
     def cleanup(self, job: Job):
         pass
 
+    def get_mounts(self) -> List[str]:
+        """Host paths the worker needs access to (bind-mounted by container backends)"""
+        return []
+
     def get_path(self):
         return f"{self.__module__}.{self.__class__.__name__}"
 
@@ -43,38 +53,346 @@ class BaseSerializer:
         )
 
 
+class TypeExtension:
+    """
+    Encodes values of a type JSON doesn't support as a binary buffer.
+
+    `encode` returns JSON-serializable metadata and a buffer,
+    `decode` rebuilds the value from them. Extensions are looked up
+    by `name`, so it has to be the same on the submitting and the worker side.
+    """
+
+    name: str = None
+
+    def matches(self, obj) -> bool:
+        raise NotImplementedError()
+
+    def encode(self, obj) -> Tuple[dict, Any]:
+        raise NotImplementedError()
+
+    def decode(self, metadata: dict, buffer: memoryview) -> Any:
+        raise NotImplementedError()
+
+
+class BytesExtension(TypeExtension):
+    name = "bytes"
+
+    def matches(self, obj) -> bool:
+        return isinstance(obj, (bytes, bytearray, memoryview))
+
+    def encode(self, obj) -> Tuple[dict, Any]:
+        if isinstance(obj, memoryview) and not obj.c_contiguous:
+            return {}, obj.tobytes()
+        return {}, obj
+
+    def decode(self, metadata: dict, buffer: memoryview) -> Any:
+        return buffer
+
+
+class NumpyArrayExtension(TypeExtension):
+    name = "numpy.ndarray"
+
+    def matches(self, obj) -> bool:
+        # do not import numpy just to find out the value is not an array
+        numpy = sys.modules.get("numpy")
+        return numpy is not None and isinstance(obj, numpy.ndarray)
+
+    def encode(self, obj) -> Tuple[dict, Any]:
+        import numpy
+
+        if obj.dtype.hasobject:
+            raise TypeError("Arrays of Python objects cannot be serialized")
+
+        # ascontiguousarray turns 0-d arrays into 1-d ones, keep the original shape
+        array = numpy.ascontiguousarray(obj)
+        metadata = {
+            "dtype": numpy.lib.format.dtype_to_descr(array.dtype),
+            "shape": list(obj.shape),
+        }
+        return metadata, array.reshape(-1).view(numpy.uint8)
+
+    def decode(self, metadata: dict, buffer: memoryview) -> Any:
+        try:
+            import numpy
+        except ImportError:
+            raise ConfigurationError("NumPy support not installed")
+
+        dtype = numpy.lib.format.descr_to_dtype(metadata["dtype"])
+        return numpy.frombuffer(buffer, dtype=dtype).reshape(metadata["shape"])
+
+
+class ArrowTableExtension(TypeExtension):
+    """
+    Encodes Arrow tables in Arrow IPC stream format or as Parquet.
+
+    Uncompressed IPC streams are decoded without copying the buffer,
+    so columns backed by a memory-mapped buffer are read only when accessed.
+    """
+
+    name = "pyarrow.Table"
+
+    FORMATS = ("ipc", "parquet")
+
+    def __init__(self, format=None, compression=NOTSET) -> None:
+        self.format = format
+        self.compression = compression
+
+    def matches(self, obj) -> bool:
+        pyarrow = sys.modules.get("pyarrow")
+        return pyarrow is not None and isinstance(obj, pyarrow.Table)
+
+    def get_format(self) -> str:
+        columnar_format = self.format or settings.COLUMNAR_FORMAT
+        if columnar_format not in self.FORMATS:
+            raise ConfigurationError(f"Unsupported columnar format: {columnar_format}")
+        return columnar_format
+
+    def get_compression(self) -> Optional[str]:
+        if self.compression is NOTSET:
+            return settings.COLUMNAR_COMPRESSION
+        return self.compression
+
+    def encode(self, obj) -> Tuple[dict, Any]:
+        pyarrow = self._import_pyarrow()
+
+        columnar_format = self.get_format()
+        compression = self.get_compression()
+        sink = pyarrow.BufferOutputStream()
+
+        if columnar_format == "parquet":
+            import pyarrow.parquet
+
+            pyarrow.parquet.write_table(obj, sink, compression=compression or "none")
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+            with pyarrow.ipc.new_stream(sink, obj.schema, options=options) as writer:
+                writer.write_table(obj)
+
+        return {"format": columnar_format}, sink.getvalue()
+
+    def decode(self, metadata: dict, buffer: memoryview) -> Any:
+        pyarrow = self._import_pyarrow()
+
+        source = pyarrow.py_buffer(buffer)
+        if metadata["format"] == "parquet":
+            import pyarrow.parquet
+
+            return pyarrow.parquet.read_table(pyarrow.BufferReader(source))
+
+        return pyarrow.ipc.open_stream(source).read_all()
+
+    def _import_pyarrow(self):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            raise ConfigurationError("Columnar support not installed")
+        return pyarrow
+
+
+class PandasDataFrameExtension(ArrowTableExtension):
+    name = "pandas.DataFrame"
+
+    def matches(self, obj) -> bool:
+        pandas = sys.modules.get("pandas")
+        return pandas is not None and isinstance(obj, pandas.DataFrame)
+
+    def encode(self, obj) -> Tuple[dict, Any]:
+        pyarrow = self._import_pyarrow()
+        return super().encode(pyarrow.Table.from_pandas(obj))
+
+    def decode(self, metadata: dict, buffer: memoryview) -> Any:
+        return super().decode(metadata, buffer).to_pandas()
+
+
+_type_extensions: Dict[str, TypeExtension] = {}
+
+
+def register_type_extension(extension: TypeExtension):
+    """Registers the extension; replaces an already registered one with the same name"""
+    _type_extensions.pop(extension.name, None)
+    _type_extensions[extension.name] = extension
+
+
+def get_type_extension(name: str) -> TypeExtension:
+    try:
+        return _type_extensions[name]
+    except KeyError:
+        raise ConfigurationError(f"Type extension {name} is not registered")
+
+
+def find_type_extension(obj) -> Optional[TypeExtension]:
+    # the most recently registered extensions take precedence
+    for extension in reversed(_type_extensions.values()):
+        if extension.matches(obj):
+            return extension
+    return None
+
+
+register_type_extension(BytesExtension())
+register_type_extension(NumpyArrayExtension())
+register_type_extension(ArrowTableExtension())
+register_type_extension(PandasDataFrameExtension())
+
+
 class JsonSerializer(BaseSerializer):
+    EXTENSION_KEY = "__themule_type__"
+
     def serialize(self, job: Job) -> str:
+        return self._dump_job(job)
+
+    def unserialize(self, data: str) -> Job:
+        return self._load_job(data)
+
+    def _dump_job(self, job: Job) -> str:
         payload = {
             "id": str(job.id),
             "func": job.func,
             "args": job.args,
             "kwargs": job.kwargs,
+            "timeout": job.timeout,
         }
         return json.dumps(
             payload,
-            default=self._json_serializer,
+            # buffers are stored per job, so the serializer can be shared by threads
+            default=partial(self._json_serializer, job=job),
         )
 
-    def unserialize(self, data: str) -> Job:
+    def _load_job(self, data: str) -> Job:
         from .job import Job
 
-        json_payload = json.loads(data)
+        json_payload = json.loads(data, object_hook=self._json_object_hook)
         return Job(
             id=UUID(json_payload["id"]),
             func=json_payload["func"],
             args=json_payload["args"],
             kwargs=json_payload["kwargs"],
+            timeout=json_payload.get("timeout"),
         )
 
-    def _json_serializer(self, obj):
+    def _store_buffer(self, buffer: memoryview, job: Job) -> dict:
+        return {"data": base64.b64encode(buffer).decode("ascii")}
+
+    def _load_buffer(self, handle: dict) -> memoryview:
+        # writable like the copy-on-write buffers of SharedMemorySerializer
+        return memoryview(bytearray(base64.b64decode(handle["data"])))
+
+    def _json_serializer(self, obj, job: Job):
         if isinstance(obj, (datetime, date)):
             return obj.isoformat()
 
+        extension = find_type_extension(obj)
+        if extension:
+            metadata, buffer = extension.encode(obj)
+            return {
+                self.EXTENSION_KEY: {
+                    "type": extension.name,
+                    "metadata": metadata,
+                    **self._store_buffer(memoryview(buffer).cast("B"), job),
+                }
+            }
+
         raise TypeError(f"Type {type(obj)} is not JSON serializable")
 
+    def _json_object_hook(self, obj):
+        if self.EXTENSION_KEY not in obj or len(obj) != 1:
+            return obj
+
+        handle = obj[self.EXTENSION_KEY]
+        if not self._is_handle(handle):
+            # a user dict which only happens to use the same key
+            return obj
+
+        extension = get_type_extension(handle["type"])
+        return extension.decode(handle["metadata"], self._load_buffer(handle))
+
+    @staticmethod
+    def _is_handle(handle) -> bool:
+        return (
+            isinstance(handle, dict)
+            and isinstance(handle.get("type"), str)
+            and isinstance(handle.get("metadata"), dict)
+            and len(handle.keys() - {"type", "metadata"}) == 1
+            and ("data" in handle or "file" in handle)
+        )
+
+
+class SharedMemorySerializer(JsonSerializer):
+    """
+    Passes buffer arguments (bytes, arrays, tables) to local workers through memory.
+
+    Encoded buffers bigger than the threshold are written to files under `path`
+    (a tmpfs by default) and only their handles are put into the job spec.
+    The worker maps the files copy-on-write instead of reading them,
+    so the arguments are never copied on the worker side.
+    Bytes-like arguments are delivered to the job function as `memoryview`.
+    """
+
+    OPTION_PREFIX = "shm"
 
-class RedisStoreSerializer(BaseSerializer):
+    DEFAULT_PATH = "/dev/shm/themule"
+    DEFAULT_THRESHOLD = 64 * 1024  # 64 KiB
+
+    def __init__(self, **options) -> None:
+        self.path = self.get_option_value(
+            options, "path", default=self.DEFAULT_PATH, cast=str
+        )
+        self.threshold = self.get_option_value(
+            options, "threshold", default=self.DEFAULT_THRESHOLD, cast=int
+        )
+        # keyed by job id, so cleaning up one job leaves the others intact
+        self._mappings: Dict[str, List[mmap.mmap]] = {}
+        self._segment_paths: Dict[str, Set[str]] = {}
+
+    def cleanup(self, job: Job):
+        for mapping in self._mappings.pop(str(job.id), []):
+            try:
+                mapping.close()
+            except BufferError:
+                # the job function still holds a reference to the buffer;
+                # the memory is released once it's garbage collected
+                pass
+
+        # segments written by this instance (a failed submit) and segments mapped
+        # from handles, which may point to a path configured on the submitting side
+        segment_paths = self._segment_paths.pop(str(job.id), set())
+        segment_paths.add(os.path.join(self.path, str(job.id)))
+        for segment_path in segment_paths:
+            shutil.rmtree(segment_path, ignore_errors=True)
+
+    def get_mounts(self) -> List[str]:
+        # a mount point missing on the host would be created by Docker as root
+        os.makedirs(self.path, exist_ok=True)
+        return [self.path]
+
+    def _store_buffer(self, buffer: memoryview, job: Job) -> dict:
+        if buffer.nbytes < self.threshold or not buffer.nbytes:
+            return super()._store_buffer(buffer, job)
+
+        job_path = os.path.join(self.path, str(job.id))
+        os.makedirs(job_path, exist_ok=True)
+        file_path = os.path.join(job_path, uuid4().hex)
+        with open(file_path, "wb") as f:
+            f.write(buffer)
+
+        return {"file": file_path}
+
+    def _load_buffer(self, handle: dict) -> memoryview:
+        if "file" not in handle:
+            return super()._load_buffer(handle)
+
+        file_path = handle["file"]
+        with open(file_path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        segment_path = os.path.dirname(file_path)
+        job_id = os.path.basename(segment_path)
+        self._mappings.setdefault(job_id, []).append(mapping)
+        self._segment_paths.setdefault(job_id, set()).add(segment_path)
+        return memoryview(mapping)
+
+
+class RedisStoreSerializer(JsonSerializer):
     OPTION_PREFIX = "redis_store"
 
     DEFAULT_PREFIX = "themule_job/"
@@ -104,39 +422,24 @@ class RedisStoreSerializer(BaseSerializer):
 
         conn = redis.from_url(self.redis_url)
 
-        payload = {
-            "id": str(job.id),
-            "func": job.func,
-            "args": job.args,
-            "kwargs": job.kwargs,
-        }
-        json_payload = json.dumps(
-            payload,
-            default=self._json_serializer,
-        )
+        json_payload = self._dump_job(job)
 
         key = self._make_key(job)
-        conn.setex(key, json_payload, self.ttl)
+        conn.setex(key, self.ttl, json_payload)
+        return key
 
     def unserialize(self, data: str) -> Job:
         try:
             import redis
         except ImportError:
             raise ConfigurationError("Redis support not installed")
-        from .job import Job
 
         conn = redis.from_url(self.redis_url)
 
         key = data
         payload = conn.get(key)
 
-        json_payload = json.loads(payload)
-        job = Job(
-            id=UUID(json_payload["id"]),
-            func=json_payload["func"],
-            args=json_payload["args"],
-            kwargs=json_payload["kwargs"],
-        )
+        job = self._load_job(payload)
 
         key_check = self._make_key(job)
         assert key == key_check
@@ -151,9 +454,3 @@ class RedisStoreSerializer(BaseSerializer):
         conn = redis.from_url(self.redis_url)
         key = self._make_key(job)
         conn.expire(key, self.cleanup_ttl)
-
-    def _json_serializer(self, obj):
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-
-        raise TypeError(f"Type {type(obj)} is not JSON serializable")
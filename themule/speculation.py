@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from .conf import NOTSET, settings
+from .exceptions import ConfigurationError
+from .heartbeats import FAILED, RUNNING, SUCCEEDED, Heartbeat, get_heartbeat
+
+if TYPE_CHECKING:
+    from .job import JobFunction, StartedJob
+
+
+@dataclass
+class _Attempt:
+    started_job: StartedJob
+    submitted_at: float = field(default_factory=time.time)
+    heartbeat: Optional[Heartbeat] = None
+    # the worker didn't start, or stopped sending heartbeats without reporting the outcome
+    stale: bool = False
+    terminated: bool = False
+
+    def is_running(self) -> bool:
+        return (
+            not self.stale
+            and self.heartbeat is not None
+            and self.heartbeat.status == RUNNING
+        )
+
+    def is_dead(self) -> bool:
+        return self.stale or (
+            self.heartbeat is not None and self.heartbeat.status == FAILED
+        )
+
+
+@dataclass
+class _SpeculativeJob:
+    args: Any
+    kwargs: Dict[str, Any]
+    attempts: List[_Attempt] = field(default_factory=list)
+    winner: Optional[StartedJob] = None
+    finished: bool = False
+
+
+class SpeculativeFanOut:
+    """
+    Submits a fan-out of jobs and re-executes stragglers.
+
+    Once enough jobs have finished, every job running longer than the given
+    percentile of their runtimes gets a duplicate. The first attempt to succeed
+    wins and the remaining attempts are terminated through the backend.
+    Requires a heartbeat store shared by the workers and the submitting process.
+    Attempts which don't start, stop sending heartbeats or run past the job
+    timeout are terminated and relaunched while `max_attempts` allows.
+
+        fan_out = SpeculativeFanOut(do_something)
+        for i in range(100):
+            fan_out.submit(job_number=i)
+        fan_out.wait()
+    """
+
+    OPTION_PREFIX = "speculative"
+
+    DEFAULT_PERCENTILE = 90
+    DEFAULT_MIN_FINISHED = 0.5  # fraction of the fan-out
+    DEFAULT_MAX_ATTEMPTS = 2
+    DEFAULT_POLL_INTERVAL = 10  # seconds
+    DEFAULT_STALE_AFTER = 300  # seconds
+
+    def __init__(self, job_function: JobFunction, **options) -> None:
+        options = {**job_function.additional_kwargs, **options}
+
+        self.job_function = job_function
+        self.percentile = self.get_option_value(
+            options, "percentile", default=self.DEFAULT_PERCENTILE, cast=float
+        )
+        self.min_finished = self.get_option_value(
+            options, "min_finished", default=self.DEFAULT_MIN_FINISHED, cast=float
+        )
+        self.max_attempts = self.get_option_value(
+            options, "max_attempts", default=self.DEFAULT_MAX_ATTEMPTS, cast=int
+        )
+        self.poll_interval = self.get_option_value(
+            options, "poll_interval", default=self.DEFAULT_POLL_INTERVAL, cast=float
+        )
+        self.stale_after = self.get_option_value(
+            options, "stale_after", default=self.DEFAULT_STALE_AFTER, cast=float
+        )
+        self.start_timeout = self.get_option_value(
+            options, "start_timeout", default=self.stale_after, cast=float
+        )
+        self.timeout = self.get_option_value(
+            options, "timeout", default=None, cast=float
+        )
+
+        self.store = job_function.get_heartbeat_store(options)
+        if self.store is None:
+            raise ConfigurationError("Speculative execution requires a heartbeat store")
+
+        self.serializer = job_function.get_serializer(options)
+        self.backend = job_function.get_backend(options)
+        self.jobs: List[_SpeculativeJob] = []
+
+    def submit(self, *args, **kwargs):
+        speculative_job = _SpeculativeJob(args=args, kwargs=kwargs)
+        self._launch(speculative_job)
+        self.jobs.append(speculative_job)
+
+    def wait(self, timeout: Optional[float] = None) -> List[Optional[StartedJob]]:
+        """
+        Blocks until every job has finished or `timeout` seconds have passed.
+
+        Returns the winning attempt of each job in submission order,
+        or None for jobs whose every attempt has failed or lost its heartbeat
+        and for jobs still running when the timeout passed (they're terminated).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.time() + timeout if timeout else None
+        while True:
+            now = time.time()
+            for speculative_job in self.jobs:
+                if not speculative_job.finished:
+                    self._update(speculative_job, now)
+
+            if deadline is not None and now > deadline:
+                for speculative_job in self.jobs:
+                    if not speculative_job.finished:
+                        self._finish(speculative_job, "Speculative fan-out timed out")
+
+            if all(speculative_job.finished for speculative_job in self.jobs):
+                return [speculative_job.winner for speculative_job in self.jobs]
+
+            threshold = self._get_straggler_threshold()
+            if threshold is not None:
+                for speculative_job in self.jobs:
+                    if self._is_straggler(speculative_job, threshold, now):
+                        self._launch(speculative_job)
+
+            time.sleep(self.poll_interval)
+
+    def _launch(self, speculative_job: _SpeculativeJob):
+        job = self.job_function.make_job(speculative_job.args, speculative_job.kwargs)
+        started_job = self.job_function.start_job(job, self.serializer, self.backend)
+        speculative_job.attempts.append(_Attempt(started_job))
+
+    def _update(self, speculative_job: _SpeculativeJob, now: float):
+        for attempt in speculative_job.attempts:
+            heartbeat = get_heartbeat(self.store, str(attempt.started_job.job.id))
+            attempt.heartbeat = heartbeat
+
+            if heartbeat and heartbeat.status == SUCCEEDED:
+                speculative_job.winner = attempt.started_job
+                speculative_job.finished = True
+                break
+
+            reason = self._get_stale_reason(attempt, now)
+            if reason:
+                # the worker may be hung rather than gone, make sure it's stopped
+                attempt.stale = True
+                self._terminate(attempt, reason)
+        else:
+            if all(attempt.is_dead() for attempt in speculative_job.attempts):
+                if (
+                    any(attempt.stale for attempt in speculative_job.attempts)
+                    and len(speculative_job.attempts) < self.max_attempts
+                ):
+                    self._launch(speculative_job)
+                else:
+                    speculative_job.finished = True
+
+        if speculative_job.finished:
+            self._finish(speculative_job, "Speculative attempt lost")
+
+    def _get_stale_reason(self, attempt: _Attempt, now: float) -> Optional[str]:
+        heartbeat = attempt.heartbeat
+        if heartbeat is None:
+            # the worker failed before its first heartbeat (e.g. an import error)
+            if now - attempt.submitted_at > self.start_timeout:
+                return "Attempt not started"
+            return None
+
+        if heartbeat.status != RUNNING:
+            return None
+        if now - heartbeat.updated_at > self.stale_after:
+            return "Heartbeat lost"
+
+        # heartbeats are sent from a thread, they go on while the job is stuck
+        timeout = attempt.started_job.job.timeout
+        if timeout and heartbeat.get_runtime(now) > timeout + self.stale_after:
+            return "Timeout exceeded"
+        return None
+
+    def _finish(self, speculative_job: _SpeculativeJob, reason: str):
+        speculative_job.finished = True
+        for attempt in speculative_job.attempts:
+            if attempt.heartbeat is None or not attempt.heartbeat.is_finished():
+                self._terminate(attempt, reason)
+
+    def _terminate(self, attempt: _Attempt, reason: str):
+        if not attempt.terminated:
+            attempt.terminated = True
+            self.backend.terminate_job(attempt.started_job, reason)
+
+    def _get_straggler_threshold(self) -> Optional[float]:
+        runtimes = sorted(
+            attempt.heartbeat.get_runtime()
+            for speculative_job in self.jobs
+            for attempt in speculative_job.attempts
+            if attempt.started_job is speculative_job.winner
+        )
+        if not runtimes or len(runtimes) < self.min_finished * len(self.jobs):
+            return None
+
+        rank = math.ceil(self.percentile / 100 * len(runtimes))
+        return runtimes[max(rank, 1) - 1]
+
+    def _is_straggler(
+        self, speculative_job: _SpeculativeJob, threshold: float, now: float
+    ) -> bool:
+        if speculative_job.finished:
+            return False
+        if len(speculative_job.attempts) >= self.max_attempts:
+            return False
+
+        running = [
+            attempt.heartbeat
+            for attempt in speculative_job.attempts
+            if attempt.is_running()
+        ]
+        return bool(running) and all(
+            heartbeat.get_runtime(now) > threshold for heartbeat in running
+        )
+
+    def get_option_value(self, options, option, default=NOTSET, cast=None):
+        return settings.get_value_for_job(
+            options,
+            self.OPTION_PREFIX,
+            option,
+            default=default,
+            cast=cast,
+        )
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+from .conf import NOTSET, settings
+from .exceptions import ConfigurationError
+
+
+class BaseStore:
+    OPTION_PREFIX = "base"
+
+    def __init__(self, **options) -> None:
+        pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    def set(self, key: str, value: bytes):
+        raise NotImplementedError()
+
+    def delete(self, key: str):
+        raise NotImplementedError()
+
+    def exists(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def get_path(self):
+        return f"{self.__module__}.{self.__class__.__name__}"
+
+    def get_option_value(self, options, option, default=NOTSET, cast=None):
+        return settings.get_value_for_job(
+            options,
+            self.OPTION_PREFIX,
+            option,
+            default=default,
+            cast=cast,
+        )
+
+
+class LocalStore(BaseStore):
+    OPTION_PREFIX = "local_store"
+
+    DEFAULT_PATH = "/tmp/themule"
+
+    def __init__(self, **options) -> None:
+        self.path = self.get_option_value(
+            options, "path", default=self.DEFAULT_PATH, cast=str
+        )
+
+    def _make_path(self, key: str) -> str:
+        return os.path.join(self.path, *key.split("/"))
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._make_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def set(self, key: str, value: bytes):
+        path = self._make_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # readers never see partially written values
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._make_path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._make_path(key))
+
+
+class RedisStore(BaseStore):
+    OPTION_PREFIX = "redis_store"
+
+    DEFAULT_PREFIX = "themule/"
+
+    def __init__(self, **options) -> None:
+        self.redis_url = self.get_option_value(options, "url")
+        self.prefix = self.get_option_value(
+            options, "prefix", default=self.DEFAULT_PREFIX, cast=str
+        )
+
+    def _get_connection(self):
+        try:
+            import redis
+        except ImportError:
+            raise ConfigurationError("Redis support not installed")
+
+        return redis.from_url(self.redis_url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._get_connection().get(f"{self.prefix}{key}")
+
+    def set(self, key: str, value: bytes):
+        self._get_connection().set(f"{self.prefix}{key}", value)
+
+    def delete(self, key: str):
+        self._get_connection().delete(f"{self.prefix}{key}")
+
+    def exists(self, key: str) -> bool:
+        return bool(self._get_connection().exists(f"{self.prefix}{key}"))
+
+
+class S3Store(BaseStore):
+    OPTION_PREFIX = "s3_store"
+
+    DEFAULT_PREFIX = "themule/"
+
+    def __init__(self, **options) -> None:
+        self.bucket = self.get_option_value(options, "bucket")
+        self.prefix = self.get_option_value(
+            options, "prefix", default=self.DEFAULT_PREFIX, cast=str
+        )
+        self.endpoint_url = self.get_option_value(options, "endpoint_url", default=None)
+
+    def _get_client(self):
+        try:
+            import boto3
+        except ImportError:
+            raise ConfigurationError("AWS support not installed")
+
+        return boto3.client("s3", endpoint_url=self.endpoint_url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        client = self._get_client()
+        try:
+            response = client.get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")
+        except client.exceptions.NoSuchKey:
+            return None
+        return response["Body"].read()
+
+    def set(self, key: str, value: bytes):
+        self._get_client().put_object(
+            Bucket=self.bucket,
+            Key=f"{self.prefix}{key}",
+            Body=value,
+        )
+
+    def delete(self, key: str):
+        self._get_client().delete_object(Bucket=self.bucket, Key=f"{self.prefix}{key}")
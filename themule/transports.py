@@ -0,0 +1,125 @@
+"""
+Delivery of serialized jobs from backends to the `execute-job` command.
+
+Small specs are passed as a command argument. Bigger ones are compressed and
+passed in environment variables (split into chunks fitting the per-variable
+limit), through the worker's stdin or in a file.
+"""
+from __future__ import annotations
+
+import base64
+import os
+import zlib
+from dataclasses import dataclass, field
+from typing import IO, Dict, List, Mapping, Optional
+
+from .exceptions import ConfigurationError
+
+ARGV = "argv"
+ENV = "env"
+STDIN = "stdin"
+FILE = "file"
+AUTO = "auto"
+
+TRANSPORTS = (ARGV, ENV, STDIN, FILE)
+
+ENV_VARIABLE = "THEMULE_JOB_SPEC"
+# Linux limits a single argument or environment variable to 128 KiB
+ENV_CHUNK_SIZE = 96 * 1024
+READ_SIZE = 64 * 1024
+
+
+@dataclass
+class Delivery:
+    """How to pass a job spec to the worker: extra arguments, environment and stdin"""
+
+    transport: str
+    arguments: List[str]
+    environment: Dict[str, str] = field(default_factory=dict)
+    stdin: Optional[bytes] = None
+
+    def get_size(self) -> int:
+        return sum(len(argument) for argument in self.arguments) + sum(
+            len(name) + len(value) for name, value in self.environment.items()
+        )
+
+
+def deliver(spec: str, transport: str, file_path: Optional[str] = None) -> Delivery:
+    if transport == ARGV:
+        return Delivery(ARGV, [spec])
+
+    arguments = ["--transport", transport]
+    compressed = zlib.compress(spec.encode())
+
+    if transport == ENV:
+        encoded = base64.b64encode(compressed).decode("ascii")
+        chunks = [
+            encoded[offset : offset + ENV_CHUNK_SIZE]
+            for offset in range(0, len(encoded), ENV_CHUNK_SIZE)
+        ]
+        environment = {f"{ENV_VARIABLE}_CHUNKS": str(len(chunks))}
+        for i, chunk in enumerate(chunks):
+            environment[f"{ENV_VARIABLE}_{i}"] = chunk
+        return Delivery(ENV, arguments, environment=environment)
+
+    if transport == STDIN:
+        return Delivery(STDIN, arguments, stdin=compressed)
+
+    if transport == FILE:
+        if not file_path:
+            raise ConfigurationError("File transport requires a path of the spec file")
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(compressed)
+        return Delivery(FILE, [*arguments, "--spec-file", file_path])
+
+    raise ConfigurationError(f"Unknown job spec transport: {transport}")
+
+
+def receive(
+    transport: str,
+    spec: Optional[str] = None,
+    *,
+    stdin: Optional[IO[bytes]] = None,
+    environ: Optional[Mapping[str, str]] = None,
+    file_path: Optional[str] = None,
+) -> str:
+    if transport == ARGV:
+        if spec is None:
+            raise ConfigurationError("Job spec argument is missing")
+        return spec
+
+    if transport == ENV:
+        environ = os.environ if environ is None else environ
+        decompressor = zlib.decompressobj()
+        parts = []
+        for i in range(int(environ[f"{ENV_VARIABLE}_CHUNKS"])):
+            chunk = environ[f"{ENV_VARIABLE}_{i}"]
+            parts.append(decompressor.decompress(base64.b64decode(chunk)))
+        parts.append(decompressor.flush())
+        return b"".join(parts).decode()
+
+    if transport == STDIN:
+        return _read_stream(stdin)
+
+    if transport == FILE:
+        if not file_path:
+            raise ConfigurationError("File transport requires a path of the spec file")
+        with open(file_path, "rb") as f:
+            spec = _read_stream(f)
+        os.remove(file_path)
+        return spec
+
+    raise ConfigurationError(f"Unknown job spec transport: {transport}")
+
+
+def _read_stream(stream: IO[bytes]) -> str:
+    decompressor = zlib.decompressobj()
+    parts = []
+    while True:
+        chunk = stream.read(READ_SIZE)
+        if not chunk:
+            break
+        parts.append(decompressor.decompress(chunk))
+    parts.append(decompressor.flush())
+    return b"".join(parts).decode()